@@ -2,23 +2,28 @@
 
 import argparse
 import collections
+import concurrent.futures
 import datetime
+import errno
+import fcntl
+import functools
 import json
+import operator
 import os
-import pwd
 import re
-import smtplib
+import shlex
+import shutil
 import socket
 import subprocess
 import sys
+import threading
 import time
 import typing
-import urllib.request
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.header import Header
 
-import jinja2
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # backups process
@@ -38,17 +43,107 @@ ConfigOptions = (
     "chown",
     "mysql",
     "bwlimit",
+    "reflink",
 )
 
 # BackupProperties defines standard set of backup configuration properties
 BackupProperties = {opt: None for opt in ConfigOptions}
 BackupProperties.update(dict(enabled=True))
 
+# RsyncOptions defines constant options passed to every rsync process
+RsyncOptions = ("--delete", "--stats", "--no-h")
+
+# RsyncSize matches total size of backed up files in rsync --stats output
+RsyncSize = re.compile(rb"Total file size: (\d+)")
+
+# RsyncItemized matches rsync --itemize-changes lines, rsync outputs one for
+# every created, deleted or updated item including attribute-only updates
+RsyncItemized = re.compile(rb"(\*deleting|[<>ch.][fdLDS][^ ]{7,9}) ")
+
+# RenameExchange is renameat2() flag to atomically exchange two paths
+RenameExchange = 2
+
+# RenameAt2Syscall maps kernel machine name and pointer size of the running
+# process to renameat2 system call numbers for C libraries older than glibc
+# 2.28 which lack renameat2() wrapper; 32-bit processes on 64-bit x86 kernels
+# are left out as i386 and x32 can not be told apart by pointer size
+RenameAt2Syscall = {
+    ("x86_64", 8): 316,
+    ("i686", 4): 353,
+    ("aarch64", 8): 276,
+    ("aarch64", 4): 382,
+    ("armv7l", 4): 382,
+    ("ppc64le", 8): 357,
+    ("s390x", 8): 347,
+}
+
+# PrintLock serializes output of parallel backup jobs
+PrintLock = threading.Lock()
+
+# CacheVersion must be increased whenever the format of configuration cache
+# files changes so stale cache files are discarded
+CacheVersion = 1
+
+
+@functools.lru_cache(maxsize=1)
+def current_user() -> str:
+    """Return name of the user running the process"""
+    import pwd
+
+    return pwd.getpwuid(os.getuid()).pw_name
+
+
+@functools.lru_cache(maxsize=1)
+def libc() -> "ctypes.CDLL":
+    """Return handle to C library functions"""
+    import ctypes
+
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def rename_exchange(src: str, dst: str, dir_fd: int) -> None:
+    """Atomically exchange two entries in a directory with renameat2()"""
+    import ctypes
+    import platform
+
+    src_name, dst_name = os.fsencode(src), os.fsencode(dst)
+    renameat2 = getattr(libc(), "renameat2", None)
+    if renameat2 is None:
+        # call renameat2 directly by system call number
+        abi = (platform.machine(), ctypes.sizeof(ctypes.c_void_p))
+        number = RenameAt2Syscall.get(abi)
+        if number is None:
+            raise OSError(errno.ENOSYS, "renameat2 is not available", src, None, dst)
+        fd, flags = ctypes.c_long(dir_fd), ctypes.c_long(RenameExchange)
+        result = libc().syscall(
+            ctypes.c_long(number), fd, src_name, fd, dst_name, flags
+        )
+    else:
+        result = renameat2(dir_fd, src_name, dir_fd, dst_name, RenameExchange)
+    if result != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), src, None, dst)
+
+
+def json_dumps(data: object) -> bytes:
+    """Serialize data to compact JSON, use orjson module if available"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("UTF-8")
+
+
+def json_loads(data: bytes) -> object:
+    """Deserialize JSON data, use orjson module if available"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def verbose_print(msg: str, *args: list, **kwargs: dict) -> None:
     """Print message if verbose flag has been set"""
     if cmd_args.verbose:
-        print(msg, *args, **kwargs)
+        with PrintLock:
+            print(msg, *args, **kwargs)
 
 
 class FileLock(object):
@@ -57,33 +152,36 @@ class FileLock(object):
     def __init__(self, name: str) -> None:
         """Class constructor"""
         self.name = name
+        self.fd = None
         self.acquired = False
 
     def __enter__(self) -> "FileLock":
         """Acquire lock"""
         if self.acquired:
             return self
-        # make sure process is not already running
-        if os.path.exists(self.name):
-            try:
-                pid = int(open(self.name, "r").read())
-                try:
-                    os.kill(pid, 0)
-                    return self
-                except OSError:
-                    pass
-            except ValueError:
-                pass
-        # acquire lock
-        with open(self.name, "w+") as fh:
-            fh.write(str(os.getpid()))
+        # the lock is held by kernel until file descriptor is closed,
+        # so it is released even if the process is killed
+        self.fd = os.open(self.name, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # record lock owner for informational purposes only
+            os.ftruncate(self.fd, 0)
+            os.write(self.fd, str(os.getpid()).encode())
             self.acquired = True
+        except OSError as e:
+            # __exit__ is not called when __enter__ fails, closing file
+            # descriptor here also releases the lock if it was taken
+            os.close(self.fd)
+            self.fd = None
+            if not isinstance(e, BlockingIOError):
+                raise
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Release acquired lock"""
         if self.acquired:
-            os.unlink(self.name)
+            os.close(self.fd)
+            self.fd = None
             self.acquired = False
 
 
@@ -104,6 +202,9 @@ class BackupDir(str):
 class Backup(collections.namedtuple("Backup", ConfigOptions)):
     """Backup object represents a backup job and its properties"""
 
+    # do not allocate per-instance __dict__, fields are stored in the tuple
+    __slots__ = ()
+
     @property
     def latest_dir(self) -> BackupDir:
         """Get the full path to the directory of the latest backup"""
@@ -117,7 +218,7 @@ class Backup(collections.namedtuple("Backup", ConfigOptions)):
     @property
     def username(self) -> str:
         """Returns default username to use in connection"""
-        return self.user or pwd.getpwuid(os.getuid()).pw_name
+        return self.user or current_user()
 
     @property
     def options(self) -> typing.List[str]:
@@ -125,9 +226,7 @@ class Backup(collections.namedtuple("Backup", ConfigOptions)):
         opts = [
             "/usr/bin/rsync",
             "-aRHS" if len(self.files or []) > 1 else "-aHS",
-            "--delete",
-            "--stats",
-            "--no-h",
+            *RsyncOptions,
         ]
         if self.fakesuper:
             opts.append("--fake-super")
@@ -135,35 +234,55 @@ class Backup(collections.namedtuple("Backup", ConfigOptions)):
             opts.append(f"--chown={self.chown}")
         if self.bwlimit:
             opts.append(f"--bwlimit={self.bwlimit}")
-        opts.append(f"--link-dest={self.latest_dir.files}")
-        for include in self.files or []:
-            if self.name == "localhost":
-                opts.append(include)
-            else:
-                opts.append(f"{self.username}@{self.address or self.name}:{include}")
-        for exclude in self.exclude or []:
-            opts.append(f"--exclude={exclude}")
+        # reflink backups start from a clone of the latest backup instead,
+        # itemized changes tell if rsync has modified the clone in any way
+        if self.reflink:
+            opts.append("--itemize-changes")
+        else:
+            opts.append(f"--link-dest={self.latest_dir.files}")
+        # remote source prefix is the same for all files
+        source = ""
+        if self.name != "localhost":
+            source = f"{self.username}@{self.address or self.name}:"
+        opts.extend(source + include for include in self.files or [])
+        opts.extend(f"--exclude={exclude}" for exclude in self.exclude or [])
         opts.append(self.target_dir.files)
         return opts
 
     def rotate(self) -> None:
         """Rotate backups to move latest backup in backup.0 directory"""
-        # move target backup out of the way by renaming to backup.tmp
-        temp_dir = f"{self.target}/backup.tmp"
-        os.rename(self.target_dir, temp_dir)
-        # rotate backups
-        for idx in range(self.backups - 1, -1, -1):
-            src = f"{self.target}/backup.{idx}"
-            dst = f"{self.target}/backup.{idx+1}"
-            os.rename(src, dst)
-        # make target backup last by renaming to backup.0
-        os.rename(temp_dir, self.latest_dir)
-
-    def update(self, endpoint: str, data: dict):
+        # rename entries relative to target directory descriptor so the
+        # target path is resolved only once for all renames
+        target_fd = os.open(self.target, os.O_RDONLY | os.O_DIRECTORY)
+        rename = functools.partial(
+            os.rename, src_dir_fd=target_fd, dst_dir_fd=target_fd
+        )
+        try:
+            # exchange target backup with older ones until it becomes backup.0,
+            # each exchange is atomic so none of the backups is ever missing
+            for idx in range(self.backups, 0, -1):
+                rename_exchange(f"backup.{idx}", f"backup.{idx-1}", target_fd)
+        except OSError as e:
+            # fall back to renames if exchange is not supported at all
+            if e.errno not in (errno.ENOSYS, errno.EINVAL) or idx != self.backups:
+                raise
+            # move target backup out of the way by renaming to backup.tmp
+            rename(f"backup.{self.backups}", "backup.tmp")
+            # rotate backups
+            for idx in range(self.backups - 1, -1, -1):
+                rename(f"backup.{idx}", f"backup.{idx+1}")
+            # make target backup last by renaming to backup.0
+            rename("backup.tmp", "backup.0")
+        finally:
+            os.close(target_fd)
+
+    def update(self, endpoint: str, data: bytes):
         """Update backup status to API endpoint"""
+        import urllib.request
+
         req = urllib.request.Request(
             endpoint,
-            data=data.encode("UTF-8"),
+            data=data,
             method="POST",
             headers={
                 "Content-Type": "application/json",
@@ -177,42 +296,146 @@ class Backup(collections.namedtuple("Backup", ConfigOptions)):
 
     def run(self, status: str = None) -> None:
         """Perform backup with rsync, rotate old backups and save stats"""
-        # make sure all backup target directories exist
+        # make sure all backup target directories exist; a single scan of
+        # target directory finds the missing ones without a stat call each
+        with os.scandir(self.target) as entries:
+            existing = {entry.name for entry in entries if entry.is_dir()}
         for idx in range(self.backups):
-            backup_dir = f"{self.target}/backup.{idx}"
-            if not os.path.isdir(backup_dir):
-                os.makedirs(backup_dir)
+            if f"backup.{idx}" not in existing:
+                os.mkdir(f"{self.target}/backup.{idx}")
+        # backup directories are built once for the whole run
+        latest_dir, target_dir = self.latest_dir, self.target_dir
         # get start time for later reference
         start = int(time.time())
+        # clone latest backup into target directory with reflinks, this is a
+        # single ioctl per file on filesystems with copy-on-write support
+        cloned = False
+        if self.reflink and os.path.isdir(latest_dir.files):
+            # target backup is not pre-created when number of backups grows
+            os.makedirs(target_dir, exist_ok=True)
+            # leftovers of the target backup would make cp copy into a nested
+            # files directory, so a failed removal stops the backup
+            try:
+                shutil.rmtree(target_dir.files)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                with PrintLock:
+                    print(f"[{self.name}] Unable to remove {target_dir.files}: {e}")
+                return
+            clone = subprocess.run(
+                [
+                    "cp",
+                    "--reflink=auto",
+                    "-a",
+                    latest_dir.files,
+                    target_dir.files,
+                ],
+            )
+            if clone.returncode != 0:
+                with PrintLock:
+                    print(f"[{self.name}] Clone return code {clone.returncode}")
+                return
+            cloned = True
         # make sure there is a target directory for files backups
-        if not os.path.isdir(backup.target_dir.files):
-            os.makedirs(backup.target_dir.files)
-        verbose_print("Starting command: {0}".format(" ".join(self.options)))
-        rsync = subprocess.run(self.options, stdout=subprocess.PIPE)
+        try:
+            os.mkdir(target_dir.files)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(target_dir.files)
+        # options are built once and used both for logging and running rsync
+        options = self.options
+        if cmd_args.verbose:
+            verbose_print(f"Starting command: {shlex.join(options)}")
+        # parse statistics while rsync output is read instead of buffering it
+        size = 0
+        changed = False
+        with subprocess.Popen(options, stdout=subprocess.PIPE) as rsync:
+            for line in rsync.stdout:
+                if cmd_args.verbose:
+                    output = line.decode(errors="replace").rstrip()
+                    verbose_print(f"[{self.name}] {output}")
+                match = RsyncSize.match(line)
+                if match:
+                    size = int(match.group(1))
+                elif not changed and self.reflink:
+                    changed = RsyncItemized.match(line) is not None
         if rsync.returncode not in (0, 24):
-            print(f"[{self.name}] Return code {rsync.returncode}")
+            with PrintLock:
+                print(f"[{self.name}] Return code {rsync.returncode}")
             return
-        self.rotate()
-        # save statistics from the backup job
-        re_size = re.compile("Total file size: (\\d+) bytes")
-        for line in rsync.stdout.decode("UTF-8").split("\n"):
-            match = re_size.match(line)
-            if match:
-                size = int(match.group(1))
-        with open(self.latest_dir.completed, "w+") as fh:
+        # target of reflink backups starts as a clone of the latest backup, if
+        # rsync itemized no changes to the clone the latest backup is kept and
+        # only its stats are updated instead of rotating all backups
+        unchanged = 0
+        completed_dir = target_dir
+        if cloned and not changed:
+            try:
+                with open(latest_dir.completed, "rb") as fh:
+                    unchanged = json_loads(fh.read()).get("unchanged", 0) + 1
+            except (OSError, ValueError):
+                unchanged = 1
+            completed_dir = latest_dir
+        # save statistics from the backup job in the new backup before it is
+        # rotated, so the backup and its statistics appear in backup.0 together
+        with open(completed_dir.completed, "wb") as fh:
             data = dict(
                 name=self.name,
                 timestamp=datetime.datetime.now().isoformat(),
                 duration=int(time.time()) - start,
                 size=size,
+                unchanged=unchanged,
             )
-            json_data = json.dumps(data, separators=",:")
+            json_data = json_dumps(data)
             fh.write(json_data)
-            if status:
-                self.update(status, json_data)
+        if not unchanged:
+            self.rotate()
+        if status:
+            self.update(status, json_data)
+
+
+def read_config(name: str) -> object:
+    """Read JSON configuration file"""
+    with open(name, "rb") as fh:
+        return json_loads(fh.read())
+
+
+def cache_header(name: str) -> tuple:
+    """Build header identifying configuration file state in cache files"""
+    stat = os.stat(name)
+    return (CacheVersion, ConfigOptions, stat.st_mtime_ns, stat.st_size)
+
+
+def load_cache(name: str, header: tuple) -> typing.Optional[typing.List[Backup]]:
+    """Load Backup objects list from cache file if it matches header"""
+    import pickle
+
+    try:
+        with open(f"{name}.cache", "rb") as fh:
+            cached_header, backups = pickle.load(fh)
+    except Exception:
+        # missing, corrupted or incompatible cache file, it will be rebuilt
+        return None
+    if cached_header != header:
+        return None
+    return backups
+
+
+def save_cache(name: str, header: tuple, backups: typing.List[Backup]) -> None:
+    """Save Backup objects list to cache file next to configuration file"""
+    import pickle
+
+    temp_name = f"{name}.cache.{os.getpid()}"
+    try:
+        with open(temp_name, "wb") as fh:
+            pickle.dump((header, backups), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_name, f"{name}.cache")
+    except OSError as e:
+        verbose_print(f"Unable to save configuration cache {name}.cache: {e}")
 
 
-def load_backups(name: str) -> typing.List[Backup]:
+def load_backups(name: str, cache: bool = False) -> typing.List[Backup]:
     """Load backup specification from the specified source and return Backup objecs listt"""
 
     def parse_backups(data: object) -> typing.List[Backup]:
@@ -223,23 +446,32 @@ def load_backups(name: str) -> typing.List[Backup]:
             templates[template.get("name")] = template
         # parse backups
         for backup_item in data.get("servers", []):
-            backup_config = dict(BackupProperties)
+            template = {}
             if backup_item.get("template"):
-                backup_config.update(templates.get(backup_item.get("template", {})))
-            backup_config.update(**backup_item)
+                template = templates[backup_item.get("template")]
+            backup_config = {**BackupProperties, **template, **backup_item}
             for k, v in backup_config.items():
-                if type(v) == str:
-                    backup_config[k] = str(v).format(**backup_config)
+                # only strings with placeholders need to be formatted
+                if isinstance(v, str) and "{" in v:
+                    backup_config[k] = v.format_map(backup_config)
             backups.append(Backup(**backup_config))
         return backups
 
     if name.startswith("http"):
+        import urllib.request
+
         req = urllib.request.urlopen(name)
-        data = json.loads(req.read().decode("utf-8"))
+        data = json_loads(req.read())
     else:
         if name.endswith(".json"):
-            with open(name, "r") as fh:
-                data = json.loads(fh.read())
+            if cache:
+                header = cache_header(name)
+                backups = load_cache(name, header)
+                if backups is None:
+                    backups = parse_backups(read_config(name))
+                    save_cache(name, header, backups)
+                return backups
+            data = read_config(name)
         else:
             if name.endswith(".py"):
                 name = name.removesuffix(".py")
@@ -247,6 +479,24 @@ def load_backups(name: str) -> typing.List[Backup]:
     return parse_backups(data)
 
 
+def run_backup(backup: Backup, status: str = None) -> None:
+    """Run backup job while holding the lock of its target directory"""
+    # lock file is kept in target directory so it has to exist first
+    os.makedirs(backup.target, exist_ok=True)
+    with FileLock(f"{backup.target}/backup.lock") as lock:
+        if not lock.acquired:
+            verbose_print(f"Unable to acquire lock for {backup.name}")
+            return
+        verbose_print(f"Starting backup {backup.name}")
+        backup.run(status)
+
+
+def run_backups(queue: typing.List[typing.Tuple[Backup, str]]) -> None:
+    """Run backup jobs sharing a target directory one after another"""
+    for backup, status in queue:
+        run_backup(backup, status)
+
+
 # backups stats
 
 BackupStatus = collections.namedtuple(
@@ -261,14 +511,35 @@ StatusText = {
 }
 StatusCodes = set()
 
-email_template = jinja2.Template(
-    """
-{% macro ColorStatus(code) %}
-{%- if code == 0 %}<b style="color: green">OK</b>{% endif -%}
-{%- if code == 1 %}<b style="color: red">ERR</b>{% endif -%}
-{%- if code == 2 %}<b style="color: magenta">UNK</b>{% endif -%}
-{% endmacro %}
-{%- for section, data in sections %}
+# StatusJobs is the default number of servers checked in parallel
+StatusJobs = 32
+
+# StatusHtml defines backup status labels in email reports
+StatusHtml = {
+    0: '<b style="color: green">OK</b>',
+    1: '<b style="color: red">ERR</b>',
+    2: '<b style="color: magenta">UNK</b>',
+}
+
+# StatusAnsi defines backup status labels in console reports
+StatusAnsi = {
+    0: " [\033[01;32mOK\033[00m] ",
+    1: "[\033[01;31mERR\033[00m] ",
+    2: "[\033[01;35mUNK\033[00m] ",
+}
+
+# ConsoleHeader defines header of status tables in console reports
+ConsoleHeader = "Status {:<50}{:<22}{:<10}{:<10}".format(
+    "Name", "Last", "Duration", "Size"
+)
+
+# SizeUnits defines decimal units used to format backup sizes
+SizeUnits = ("kB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
+
+# Templates defines sources of status report templates
+Templates = {
+    "email": """
+{% for section, data in sections %}
 <h3 style="text-decoration: underline">category: {{section}}</h3>
 <table>
     <thead>
@@ -283,7 +554,7 @@ email_template = jinja2.Template(
     <tbody>
     {%- for name, status, mtime, duration, size, comment in data %}
         <tr style="background: #eee">
-            <td style="font-weight: bold">[{{ColorStatus(status)}}]</td>
+            <td style="font-weight: bold">[{{status_html[status]}}]</td>
             <td>{{name}}</td>
             <td>{% if mtime %}{{mtime.strftime('%Y/%b/%d %H:%M:%S')}}{% endif %}</td>
             <td>{{duration}}</td>
@@ -294,124 +565,186 @@ email_template = jinja2.Template(
     </tbody>
 </table>
 {% endfor -%}
-"""
-)
+""",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def get_environment() -> "jinja2.Environment":
+    """Prepare environment for status report templates on first use"""
+    import jinja2
+
+    environment = jinja2.Environment(
+        loader=jinja2.DictLoader(Templates),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(),
+    )
+    environment.globals.update(status_html=StatusHtml)
+    return environment
+
+
+def get_template(name: str) -> "jinja2.Template":
+    """Get compiled status report template, reuse bytecode cache"""
+    # environment keeps compiled templates in its own cache
+    return get_environment().get_template(name)
+
+
+def format_size(size: int) -> str:
+    """Format size in bytes as human readable text, like jinja filesizeformat"""
+    size = float(size)
+    if size == 1:
+        return "1 Byte"
+    if size < 1000:
+        return f"{int(size)} Bytes"
+    for idx, unit in enumerate(SizeUnits):
+        base = 1000 ** (idx + 2)
+        if size < base:
+            break
+    return f"{1000 * size / base:.1f} {unit}"
+
+
+def render_console(sections: list) -> str:
+    """Render status report for terminal output"""
+    lines = []
+    for section, data in sections:
+        lines.append(f"\n\033[01;37mcategory: {section}\033[00m")
+        lines.append(f"\n\033[01;33m{ConsoleHeader}\033[00m")
+        for name, status, mtime, duration, size, comment in data:
+            last = mtime.strftime("%Y/%b/%d %H:%M:%S") if mtime else "n/a"
+            lines.append(
+                f"\n {StatusAnsi.get(status, '')}{name:<50}{last:<22}"
+                f"{duration:<10}{format_size(size):<10}{comment or ''}"
+            )
+        lines.append("\n")
+    return "".join(lines)
 
-console_template = jinja2.Template(
-    """
-{%- macro ColorStatus(code) %}
-{%- if code == 0 %} [\033[01;32mOK\033[00m] {% endif -%}
-{%- if code == 1 %}[\033[01;31mERR\033[00m] {% endif -%}
-{%- if code == 2 %}[\033[01;35mUNK\033[00m] {% endif -%}
-{% endmacro %}
-{%- for section, data in sections %}
-\033[01;37mcategory: {{section}}\033[00m
-\033[01;33mStatus {{"{:<50}".format("Name")}}{{"{:<22}".format("Last")}}{{"{:<10}".format("Duration")-}}
-{{"{:<10}".format("Size")}}\033[00m
-{%- for name, status, mtime, duration, size, comment in data %}
- {{ColorStatus(status)-}}
- {{"{:<50}".format(name)-}}
- {% if mtime %}{{"{:<22}".format(mtime.strftime('%Y/%b/%d %H:%M:%S'))}}{% else %}{{"{:<22}".format("n/a")}}{% endif -%}
-{{"{:<10}".format(duration)}}{{"{:<10}".format(size|filesizeformat)}}{% if comment %}{{comment}}{% endif %}
-{%- endfor %}
-{% endfor -%}
-"""
-)
 
+@functools.lru_cache(maxsize=4096)
+def format_duration(seconds: int) -> str:
+    """Format backup duration in seconds as H:MM:SS text"""
+    return str(datetime.timedelta(seconds=seconds))
 
-def read_comment(basedir: str) -> str:
-    """Read comment file"""
-    name = os.path.join(basedir, ".comment")
-    if not os.path.exists(name):
+
+def read_comment(basedir: str, entries: typing.Optional[set] = None) -> str:
+    """Read comment file, skip it if missing from known directory entries"""
+    if entries is not None and ".comment" not in entries:
+        return None
+    try:
+        with open(os.path.join(basedir, ".comment"), "r") as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
         return None
-    with open(name, "r") as fh:
-        return fh.read().strip()
 
 
-def read_completed(path: str, today: object) -> typing.Optional[typing.List]:
+def read_completed(
+    path: str, today: object, entries: typing.Optional[set] = None
+) -> typing.Optional[typing.List]:
     """Read completed file"""
     name = os.path.join(path, "backup.0/completed")
     backup_name = os.path.basename(path)
-    if os.path.exists(name) and os.path.isfile(name):
-        with open(name, "r") as fh:
-            try:
-                data = json.loads(fh.read())
-            except json.JSONDecodeError as e:
-                data = dict(
-                    timestamp="1970-01-01T00:00:00.00",
-                    duration=0,
-                )
+    try:
+        with open(name, "rb") as fh:
+            content = fh.read()
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        content = None
+    if content is not None:
+        try:
+            data = json_loads(content)
+        except ValueError:
+            data = dict(
+                timestamp="1970-01-01T00:00:00.00",
+                duration=0,
+            )
         mtime = datetime.datetime.fromisoformat(data.get("timestamp"))
         return BackupStatus(
             name=data.get("name", backup_name),
             status=0 if mtime.date() == today else 1,
             mtime=mtime,
-            duration=str(datetime.timedelta(seconds=int(data.get("duration")))),
+            duration=format_duration(int(data.get("duration"))),
             size=data.get("size", 0),
-            comment=read_comment(path),
+            comment=read_comment(path, entries),
         )
-    return BackupStatus(backup_name, 2, None, "n/a", 0, read_comment(path))
+    return BackupStatus(backup_name, 2, None, "n/a", 0, read_comment(path, entries))
+
+
+def get_server_status(
+    args: dict, server: str, today: object
+) -> typing.Optional[BackupStatus]:
+    """Get backup status of a single server, return None if it is ignored"""
+    ServerName = os.path.relpath(server, args.root)
+    # list regular files in server directory once instead of probing each of them
+    try:
+        with os.scandir(server) as it:
+            entries = {entry.name for entry in it if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        entries = set()
+    # ignore unnecessary files
+    if not args.all:
+        if ".ignore" in entries:
+            return None
+    # check for status plugin in server backup directory
+    plugin = os.path.join(server, "status")
+    if "status" in entries:
+        # status plugins return code 0-3 and output in format:
+        # [OK|ERR|UNK]:[iso|epoch]:<mtime>:{comment}
+        # executable plugins are started directly without an extra shell,
+        # the shell is still used for scripts which can not be executed
+        command = [plugin] if os.access(plugin, os.X_OK) else ["/bin/sh", plugin]
+        try:
+            cmd = subprocess.run(command, capture_output=True)
+        except OSError:
+            cmd = subprocess.run(["/bin/sh", plugin], capture_output=True)
+        if cmd.returncode in (0, 1, 2):
+            stat, fmt, mtime_str, duration, size, comment = (
+                cmd.stdout.decode().strip().split(":")
+            )
+            if fmt.lower() == "iso":
+                mtime = datetime.datetime.fromisoformat(mtime_str)
+            elif fmt.lower() == "epoch":
+                mtime = datetime.datetime.fromtimestamp(int(mtime_str))
+            else:
+                # plugin error, display it
+                cmd.returncode = 1
+                mtime = datetime.datetime.now()
+            # save server status
+            return BackupStatus(
+                ServerName, cmd.returncode, mtime, duration, int(size), comment
+            )
+    # retrieve backup status
+    return read_completed(server, today, entries)
 
 
-def get_backup_status(args: dict, BaseDirList=[]):
-    today = datetime.datetime.now().date()
-    result_set = []
-    for server in BaseDirList:
-        ServerName = server[8:]
-        # ignore unnecessary files
-        if not args.all:
-            if os.path.isfile(os.path.join(server, ".ignore")):
-                continue
-        # check for status plugin in server backup directory
-        plugin = os.path.join(server, "status")
-        if os.path.isfile(plugin):
-            # status plugins return code 0-3 and output in format:
-            # [OK|ERR|UNK]:[iso|epoch]:<mtime>:{comment}
-            cmd = subprocess.run(["/bin/sh", plugin], capture_output=True)
-            if cmd.returncode in (0, 1, 2):
-                stat, fmt, mtime_str, duration, size, comment = (
-                    cmd.stdout.decode().strip().split(":")
-                )
-                if fmt.lower() == "iso":
-                    mtime = datetime.datetime.fromisoformat(mtime_str)
-                elif fmt.lower() == "epoch":
-                    mtime = datetime.datetime.fromtimestamp(int(mtime_str))
-                else:
-                    # plugin error, display it
-                    cmd.returncode = 1
-                    mtime = datetime.datetime.now()
-                # save server status
-                result_set.append(
-                    BackupStatus(
-                        ServerName, cmd.returncode, mtime, duration, int(size), comment
-                    )
-                )
-                StatusCodes.add(StatusText.get(cmd.returncode))
-                continue
-        # retrieve backup status
-        completed = read_completed(server, today)
-        result_set.append(completed)
-        StatusCodes.add(StatusText.get(completed.status, "ERROR"))
+def get_backup_status(futures: typing.List[concurrent.futures.Future]) -> list:
+    """Collect status of section servers, skip ignored ones"""
+    result_set = [item for item in (f.result() for f in futures) if item]
+    StatusCodes.update(StatusText.get(item.status, "ERROR") for item in result_set)
 
     # double sort by status and name
     return sorted(
         sorted(
             result_set,
-            key=lambda item: item.name,
+            key=operator.attrgetter("name"),
             reverse=False,
         ),
-        key=lambda item: item.status,
+        key=operator.attrgetter("status"),
         reverse=True,
     )
 
 
 def send_email(Message, Subject, From, To, Server):
+    import io
+    import smtplib
+    from email.generator import BytesGenerator
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.header import Header
+
     # prepare root message
     msgRoot = MIMEMultipart("related")
     msgRoot["Subject"] = Header(
         "Servers Backups Status [{0}]".format(",".join(StatusCodes)),
         "utf-8",
     ).encode()
+    msgRoot["From"] = From
     msgRoot["To"] = To
 
     # prepare HTML message
@@ -424,25 +757,38 @@ def send_email(Message, Subject, From, To, Server):
     # attach HTML message
     msgRoot.attach(msgText)
 
+    # serialize message directly to bytes with SMTP line endings
+    msgData = io.BytesIO()
+    policy = msgRoot.policy.clone(linesep="\r\n")
+    BytesGenerator(msgData, policy=policy).flatten(msgRoot)
+
     # send email
     mail = smtplib.SMTP(Server)
-    mail.sendmail(From, To, msgRoot.as_string())
+    mail.sendmail(From, To, msgData.getvalue())
     mail.quit()
 
 
 def get_all_data(args: dict) -> list:
     """Prepare and return server backups data"""
     sections = []
-    for section in os.listdir(args.root):
-        if not os.path.isdir(f"{args.root}/{section}"):
-            continue
-        SectionServers = []
-        for server in os.listdir(f"/backup/{section}"):
-            SectionServers.append(f"/backup/{section}/{server}")
-        backup_data = get_backup_status(args, SectionServers)
-        if len(backup_data):
-            sections.append((section, backup_data))
-    return sorted(sections, key=lambda item: item[0])
+    # directory entries carry file type, so no stat call is needed per entry
+    with os.scandir(args.root) as entries:
+        SectionDirs = [entry for entry in entries if entry.is_dir()]
+    # servers are checked in parallel since this is mostly waiting for file
+    # system and status plugins, servers of all sections share a single pool
+    today = datetime.datetime.now().date()
+    get_status = functools.partial(get_server_status, args, today=today)
+    with concurrent.futures.ThreadPoolExecutor(args.jobs) as executor:
+        pending = []
+        for section in SectionDirs:
+            with os.scandir(section.path) as entries:
+                futures = [executor.submit(get_status, entry.path) for entry in entries]
+            pending.append((section.name, futures))
+        for name, futures in pending:
+            backup_data = get_backup_status(futures)
+            if len(backup_data):
+                sections.append((name, backup_data))
+    return sorted(sections, key=operator.itemgetter(0))
 
 
 # main program
@@ -470,6 +816,17 @@ if __name__ == "__main__":
         help="Specify one or more configuration files",
     )
     backup.add_argument("--server", type=str, help="Backup only specified server")
+    backup.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache parsed JSON configuration files in <config>.cache files",
+    )
+    backup.add_argument(
+        "--jobs",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Number of backups to run in parallel (default: %(default)s)",
+    )
     backup.add_argument(
         "--verbose", action="store_true", help="Print debug info to stdout"
     )
@@ -510,6 +867,12 @@ if __name__ == "__main__":
         default="/backup",
         help="Backups root path",
     )
+    status.add_argument(
+        "--jobs",
+        type=int,
+        default=StatusJobs,
+        help="Number of servers checked in parallel (default: %(default)s)",
+    )
 
     # parse arguments
     cmd_args = parser.parse_args()
@@ -519,34 +882,39 @@ if __name__ == "__main__":
         # add prefix to search path
         if cmd_args.prefix and os.path.isdir(cmd_args.prefix):
             sys.path.append(cmd_args.prefix)
+        # group enabled backups by target directory, backups sharing a target
+        # run one after another in configuration order instead of failing to
+        # acquire lock of each other
+        queues = {}
         # walk all configuration files
         for config in cmd_args.config:
-            # run backup job
-            for backup in filter(lambda b: b.enabled, load_backups(config)):
-                if cmd_args.server and cmd_args.server != backup.name:
-                    if cmd_args.verbose:
-                        verbose_print(f"Skipping {backup.name}")
-                    continue
-                with FileLock(f"{backup.target}/backup.lock") as lock:
-                    if not lock.acquired:
-                        verbose_print(f"Unable to acquire lock for {backup.name}")
-                        continue
-                    verbose_print(f"Starting backup {backup.name}".format(backup.name))
-                    if config.startswith("http"):
-                        backup.run(config)
-                    else:
-                        backup.run()
+            # status is reported back only to http configuration sources
+            status_url = config if config.startswith("http") else None
+            # the same server may have several backups
+            for backup in load_backups(config, cmd_args.cache):
+                if backup.enabled and (
+                    not cmd_args.server or backup.name == cmd_args.server
+                ):
+                    queue = queues.setdefault(os.path.abspath(backup.target), [])
+                    queue.append((backup, status_url))
+        # backups of different targets are independent rsync processes,
+        # run them in parallel
+        with concurrent.futures.ThreadPoolExecutor(cmd_args.jobs) as executor:
+            jobs = [executor.submit(run_backups, queue) for queue in queues.values()]
+        # raise errors from backup jobs, if any
+        for job in jobs:
+            job.result()
     # smtp is only defined in status subcommand
     elif "smtp" in cmd_args:
         if cmd_args.mailto or cmd_args.console:
             backup_data = get_all_data(cmd_args)
         if cmd_args.mailto:
             send_email(
-                email_template.render(sections=backup_data),
+                get_template("email").render(sections=backup_data),
                 getattr(cmd_args, "subject"),
                 getattr(cmd_args, "from"),
                 getattr(cmd_args, "mailto"),
                 getattr(cmd_args, "smtp"),
             )
         if cmd_args.console:
-            print(console_template.render(sections=backup_data))
+            print(render_console(backup_data))